@@ -0,0 +1,30 @@
+"""
+Small in-process caches for hot API queries.
+
+Entries expire via TTL and are cleared explicitly when a sync completes,
+so repeat requests between syncs skip redundant table scans.
+"""
+
+import threading
+
+from cachetools import TTLCache
+
+# TTLCache is not thread-safe, and these caches cross threads: handlers
+# touch them on the event loop while clear_caches() runs on scheduler or
+# BackgroundTasks worker threads when a sync finishes. Every access
+# (including clear, which pops through the expiry list) takes this lock;
+# the critical sections are dict-sized.
+cache_lock = threading.Lock()
+
+# Table row counts shown on the dashboard/stats endpoints.
+counts_cache = TTLCache(maxsize=16, ttl=30)
+
+# Rendered /api/films/{film_id} payloads; content only changes on sync.
+film_detail_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def clear_caches():
+    """Invalidate all API caches (called after a sync run completes)."""
+    with cache_lock:
+        counts_cache.clear()
+        film_detail_cache.clear()
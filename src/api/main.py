@@ -9,12 +9,16 @@ from collections import Counter
 from pathlib import Path
 
 from fastapi import FastAPI, Depends, BackgroundTasks, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
+import orjson
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, exists, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
 
-from src.db.database import get_db, init_db
-from src.db.models import User, Film, DiaryEntry, WatchlistItem, UserFilm, SyncLog, TmdbFilm
+from src.api.cache import cache_lock, counts_cache, film_detail_cache
+from src.db.database import get_db, get_sync_db, init_db
+from src.db.models import User, Film, FilmGenre, DiaryEntry, WatchlistItem, UserFilm, SyncLog, TmdbFilm
 from src.scraper.sync import run_sync
 from src.scraper.tmdb_sync import TmdbSync, run_tmdb_sync
 
@@ -22,9 +26,13 @@ app = FastAPI(
     title="Your Letterboxd",
     description="Local backup and viewer for your Letterboxd data",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 STATIC_DIR = Path("/app/static")
+
+# Built once at import; serve_spa returns it on every miss of the built frontend.
+_FRONTEND_NOT_BUILT = HTMLResponse(content="<h1>Frontend not built</h1>", status_code=200)
 if STATIC_DIR.exists():
     app.mount("/assets", StaticFiles(directory=STATIC_DIR / "assets"), name="assets")
 
@@ -38,18 +46,32 @@ async def serve_logo():
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
     init_db()
-    from src.db.database import SessionLocal
-    db = SessionLocal()
-    try:
-        stale = db.query(SyncLog).filter(SyncLog.status == "running").all()
+    from src.db.database import AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        stale = (await db.scalars(select(SyncLog).where(SyncLog.status == "running"))).all()
         for sync in stale:
             sync.status = "interrupted"
         if stale:
-            db.commit()
-    finally:
-        db.close()
+            await db.commit()
+
+
+def _stream_json_array(items):
+    """Yield a JSON array one element at a time.
+
+    Keeps peak memory at one serialized element instead of the whole body
+    and lets the client start parsing before the last element is encoded.
+    """
+    yield b"["
+    first = True
+    for item in items:
+        if first:
+            first = False
+        else:
+            yield b","
+        yield orjson.dumps(item)
+    yield b"]"
 
 
 def _full_sync_task(username: str, fetch_details: bool = True):
@@ -91,13 +113,15 @@ def trigger_sync(
 
 
 @app.get("/api/sync/status")
-def get_sync_status(db: Session = Depends(get_db)):
+async def get_sync_status(db: AsyncSession = Depends(get_db)):
     """Get current sync status and last sync info."""
-    running = db.query(SyncLog).filter(SyncLog.status == "running").first()
+    running = await db.scalar(select(SyncLog).where(SyncLog.status == "running").limit(1))
 
-    last_sync = db.query(SyncLog).filter(
-        SyncLog.status.in_(["completed", "completed_with_errors", "failed"])
-    ).order_by(SyncLog.completed_at.desc()).first()
+    last_sync = await db.scalar(
+        select(SyncLog).where(
+            SyncLog.status.in_(["completed", "completed_with_errors", "failed"])
+        ).order_by(SyncLog.completed_at.desc()).limit(1)
+    )
 
     return {
         "is_running": running is not None,
@@ -128,17 +152,22 @@ def trigger_tmdb_sync(
 
 
 @app.get("/api/tmdb/status")
-def get_tmdb_status(db: Session = Depends(get_db)):
+def get_tmdb_status(db: Session = Depends(get_sync_db)):
     """Get TMDB enrichment status."""
     try:
         sync = TmdbSync()
         return sync.get_enrichment_status(db)
     except ValueError as e:
+        row = db.execute(select(
+            select(func.count()).select_from(Film).scalar_subquery().label("total"),
+            select(func.count()).select_from(Film).where(Film.tmdb_id.isnot(None)).scalar_subquery().label("with_tmdb_id"),
+            select(func.count()).select_from(TmdbFilm).scalar_subquery().label("enriched"),
+        )).one()
         return {
             "error": str(e),
-            "total_films": db.query(Film).count(),
-            "films_with_tmdb_id": db.query(Film).filter(Film.tmdb_id.isnot(None)).count(),
-            "films_enriched": db.query(TmdbFilm).count(),
+            "total_films": row.total,
+            "films_with_tmdb_id": row.with_tmdb_id,
+            "films_enriched": row.enriched,
         }
 
 
@@ -146,7 +175,7 @@ def get_tmdb_status(db: Session = Depends(get_db)):
 def enrich_single_film(
     film_id: int,
     force: bool = False,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_sync_db)
 ):
     """Enrich a single film with TMDB data."""
     try:
@@ -156,27 +185,48 @@ def enrich_single_film(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _cached_counts(db: AsyncSession) -> dict:
+    """Return all stats row counts from one statement, cached with a short TTL."""
+    with cache_lock:
+        counts = counts_cache.get("stats")
+    if counts is None:
+        row = (await db.execute(select(
+            select(func.count()).select_from(User).scalar_subquery().label("users"),
+            select(func.count()).select_from(Film).scalar_subquery().label("films"),
+            select(func.count()).select_from(DiaryEntry).scalar_subquery().label("diary_entries"),
+            select(func.count()).select_from(WatchlistItem).scalar_subquery().label("watchlist_items"),
+        ))).one()
+        counts = dict(row._mapping)
+        with cache_lock:
+            counts_cache["stats"] = counts
+    return counts
+
+
 @app.get("/api/stats")
-def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_db)):
     """Get database statistics."""
-    return {
-        "users": db.query(User).count(),
-        "films": db.query(Film).count(),
-        "diary_entries": db.query(DiaryEntry).count(),
-        "watchlist_items": db.query(WatchlistItem).count(),
-    }
+    return await _cached_counts(db)
 
 
 @app.get("/api/dashboard")
-def get_dashboard(db: Session = Depends(get_db)):
+async def get_dashboard(db: AsyncSession = Depends(get_db)):
     """Get comprehensive dashboard statistics."""
     now = datetime.utcnow()
     year_start = datetime(now.year, 1, 1)
     month_start = datetime(now.year, now.month, 1)
 
-    entries = db.query(DiaryEntry).all()
-    films = db.query(Film).all()
-    user_films = db.query(UserFilm).filter(UserFilm.watched == True).all()
+    entries = (await db.scalars(select(DiaryEntry))).all()
+    # Only the columns the aggregations below touch — skips description,
+    # tagline, reviews and the other wide text/JSON columns.
+    films = (await db.scalars(
+        select(Film).options(load_only(
+            Film.title, Film.year, Film.poster_url, Film.rating,
+            Film.runtime_minutes, Film.genres_json, Film.directors_json,
+            Film.cast_json, Film.crew_json, Film.countries_json,
+            Film.languages_json, Film.studios_json,
+        ))
+    )).all()
+    user_films = (await db.scalars(select(UserFilm).where(UserFilm.watched == True))).all()
 
     films_dict = {f.id: f for f in films}
     watched_film_ids = {uf.film_id for uf in user_films}
@@ -451,14 +501,14 @@ def get_dashboard(db: Session = Depends(get_db)):
 
 
 @app.get("/api/insights")
-def get_insights(db: Session = Depends(get_db)):
+async def get_insights(db: AsyncSession = Depends(get_db)):
     """Get comprehensive insights and analytics (Letterboxd + TMDB combined)."""
-    user_films = db.query(UserFilm).filter(UserFilm.watched == True).all()
+    user_films = (await db.scalars(select(UserFilm).where(UserFilm.watched == True))).all()
     user_films_by_id = {uf.film_id: uf for uf in user_films}
     watched_film_ids = set(user_films_by_id.keys())
 
-    films = {f.id: f for f in db.query(Film).filter(Film.id.in_(watched_film_ids)).all()}
-    tmdb_films = {t.film_id: t for t in db.query(TmdbFilm).filter(TmdbFilm.film_id.in_(watched_film_ids)).all()}
+    films = {f.id: f for f in (await db.scalars(select(Film).where(Film.id.in_(watched_film_ids)))).all()}
+    tmdb_films = {t.film_id: t for t in (await db.scalars(select(TmdbFilm).where(TmdbFilm.film_id.in_(watched_film_ids)))).all()}
 
     rated_films = []
     for uf in user_films:
@@ -780,15 +830,13 @@ def get_insights(db: Session = Depends(get_db)):
 
 
 @app.get("/api/insights/tmdb")
-def get_tmdb_insights(db: Session = Depends(get_db)):
+async def get_tmdb_insights(db: AsyncSession = Depends(get_db)):
     """Get insights based on TMDB enrichment data."""
-    from sqlalchemy.orm import joinedload
-
-    user_films = db.query(UserFilm).filter(UserFilm.watched == True).all()
+    user_films = (await db.scalars(select(UserFilm).where(UserFilm.watched == True))).all()
     watched_film_ids = {uf.film_id for uf in user_films}
 
-    tmdb_films = db.query(TmdbFilm).filter(TmdbFilm.film_id.in_(watched_film_ids)).all()
-    films = {f.id: f for f in db.query(Film).filter(Film.id.in_(watched_film_ids)).all()}
+    tmdb_films = (await db.scalars(select(TmdbFilm).where(TmdbFilm.film_id.in_(watched_film_ids)))).all()
+    films = {f.id: f for f in (await db.scalars(select(Film).where(Film.id.in_(watched_film_ids)))).all()}
 
     tmdb_by_film_id = {t.film_id: t for t in tmdb_films}
 
@@ -895,9 +943,9 @@ def get_tmdb_insights(db: Session = Depends(get_db)):
         for name, count in collection_counter.most_common(10)
     ]
 
-    watchlist_items = db.query(WatchlistItem).all()
+    watchlist_items = (await db.scalars(select(WatchlistItem))).all()
     watchlist_film_ids = {w.film_id for w in watchlist_items}
-    watchlist_tmdb = db.query(TmdbFilm).filter(TmdbFilm.film_id.in_(watchlist_film_ids)).all()
+    watchlist_tmdb = (await db.scalars(select(TmdbFilm).where(TmdbFilm.film_id.in_(watchlist_film_ids)))).all()
 
     streaming_counter = Counter()
     streaming_films = {}
@@ -952,13 +1000,13 @@ def get_tmdb_insights(db: Session = Depends(get_db)):
 
 
 @app.get("/api/films")
-def get_films(
+async def get_films(
     sort: str = "title",
     order: str = "asc",
     genre: Optional[str] = None,
     decade: Optional[str] = None,
     logged_only: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all watched films with filtering and sorting.
 
@@ -969,8 +1017,23 @@ def get_films(
         decade: Filter by decade (e.g., '1990s')
         logged_only: If True, only return films with diary entries
     """
-    user_films = db.query(UserFilm).filter(UserFilm.watched == True).all()
-    films = {f.id: f for f in db.query(Film).all()}
+    # Genre filtering goes through the normalized film_genres table (index
+    # probe); an empty set means the table hasn't been backfilled by a sync
+    # yet, in which case we fall back to the per-film name lists below.
+    genre_film_ids = None
+    if genre:
+        genre_film_ids = set((await db.scalars(
+            select(FilmGenre.film_id).where(FilmGenre.genre == genre)
+        )).all()) or None
+
+    user_films = (await db.scalars(select(UserFilm).where(UserFilm.watched == True))).all()
+    films = {f.id: f for f in (await db.scalars(
+        select(Film).options(load_only(
+            Film.title, Film.year, Film.poster_url, Film.rating,
+            Film.runtime_minutes, Film.genres_json, Film.directors_json,
+            Film.genres_names_json, Film.directors_names_json,
+        ))
+    )).all()}
 
     result = []
     for uf in user_films:
@@ -981,10 +1044,20 @@ def get_films(
         if logged_only and uf.watch_count == 0:
             continue
 
-        if genre:
-            genres = [g.get("name") for g in (film.genres_json or []) if isinstance(g, dict)]
-            if genre not in genres:
-                continue
+        if genre_film_ids is not None and film.id not in genre_film_ids:
+            continue
+
+        # Prefer the name lists precomputed at sync time; fall back to
+        # deriving them for rows synced before those columns existed.
+        genres = film.genres_names_json
+        if genres is None:
+            genres = [g.get("name") for g in (film.genres_json or []) if isinstance(g, dict) and g.get("type") == "genre"]
+        directors = film.directors_names_json
+        if directors is None:
+            directors = [d.get("name") for d in (film.directors_json or []) if isinstance(d, dict)]
+
+        if genre and genre_film_ids is None and genre not in genres:
+            continue
 
         if decade and film.year:
             film_decade = f"{(film.year // 10) * 10}s"
@@ -999,8 +1072,8 @@ def get_films(
             "rating": uf.rating,
             "letterboxd_rating": film.rating,
             "runtime_minutes": film.runtime_minutes,
-            "genres": [g.get("name") for g in (film.genres_json or []) if isinstance(g, dict) and g.get("type") == "genre"],
-            "directors": [d.get("name") for d in (film.directors_json or []) if isinstance(d, dict)],
+            "genres": genres,
+            "directors": directors,
             "watch_count": uf.watch_count or 0,
             "liked": uf.liked,
             "first_watched": uf.first_watched.isoformat() if uf.first_watched else None,
@@ -1016,11 +1089,11 @@ def get_films(
     elif sort == "rating":
         result.sort(key=lambda x: x["rating"] or 0, reverse=reverse)
 
-    return result
+    return StreamingResponse(_stream_json_array(result), media_type="application/json")
 
 
 @app.get("/api/films/explorer")
-def get_films_explorer(
+async def get_films_explorer(
     search: Optional[str] = None,
     sort: str = "title",
     order: str = "asc",
@@ -1029,15 +1102,15 @@ def get_films_explorer(
     has_tmdb: Optional[bool] = None,
     certification: Optional[str] = None,
     min_budget: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get films with full Letterboxd + TMDB data for exploration.
 
     Returns paginated results with complete raw data for each film.
     """
-    user_films = db.query(UserFilm).filter(UserFilm.watched == True).all()
-    films = {f.id: f for f in db.query(Film).all()}
-    tmdb_data = {t.film_id: t for t in db.query(TmdbFilm).all()}
+    user_films = (await db.scalars(select(UserFilm).where(UserFilm.watched == True))).all()
+    films = {f.id: f for f in (await db.scalars(select(Film))).all()}
+    tmdb_data = {t.film_id: t for t in (await db.scalars(select(TmdbFilm))).all()}
 
     result = []
     for uf in user_films:
@@ -1166,15 +1239,34 @@ def get_films_explorer(
 
 
 @app.get("/api/films/{film_id}")
-def get_film_detail(film_id: int, db: Session = Depends(get_db)):
+async def get_film_detail(film_id: int, db: AsyncSession = Depends(get_db)):
     """Get detailed information for a single film."""
-    film = db.query(Film).filter(Film.id == film_id).first()
+    with cache_lock:
+        cached = film_detail_cache.get(film_id)
+    if cached is not None:
+        return cached
+
+    # One statement describes the whole fetch; the related rows arrive via
+    # selectin batches instead of hand-written follow-up queries.
+    film = await db.scalar(
+        select(Film)
+        .options(
+            selectinload(Film.user_films),
+            selectinload(Film.diary_entries),
+            selectinload(Film.tmdb_data),
+        )
+        .where(Film.id == film_id)
+    )
     if not film:
         raise HTTPException(status_code=404, detail="Film not found")
 
-    user_film = db.query(UserFilm).filter(UserFilm.film_id == film_id).first()
-    diary_entries = db.query(DiaryEntry).filter(DiaryEntry.film_id == film_id).order_by(DiaryEntry.watched_date.desc()).all()
-    tmdb_data = db.query(TmdbFilm).filter(TmdbFilm.film_id == film_id).first()
+    user_film = film.user_films[0] if film.user_films else None
+    diary_entries = sorted(
+        film.diary_entries,
+        key=lambda e: e.watched_date or datetime.min,
+        reverse=True,
+    )
+    tmdb_data = film.tmdb_data
 
     result = {
         "id": film.id,
@@ -1200,7 +1292,9 @@ def get_film_detail(film_id: int, db: Session = Depends(get_db)):
         "watch_count": user_film.watch_count if user_film else 0,
         "first_watched": user_film.first_watched.isoformat() if user_film and user_film.first_watched else None,
         "last_watched": user_film.last_watched.isoformat() if user_film and user_film.last_watched else None,
-        "in_watchlist": db.query(WatchlistItem).filter(WatchlistItem.film_id == film_id).first() is not None,
+        "in_watchlist": bool(await db.scalar(
+            select(exists().where(WatchlistItem.film_id == film_id))
+        )),
         "diary_entries": [
             {
                 "id": e.id,
@@ -1244,37 +1338,70 @@ def get_film_detail(film_id: int, db: Session = Depends(get_db)):
             "last_synced": tmdb_data.last_synced_at.isoformat() if tmdb_data.last_synced_at else None,
         }
 
+    with cache_lock:
+        film_detail_cache[film_id] = result
     return result
 
 
 @app.get("/api/diary")
-def get_diary(
+async def get_diary(
     year: Optional[int] = None,
     month: Optional[int] = None,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get diary entries with optional year/month filter."""
-    query = db.query(DiaryEntry)
+    """Get diary entries with optional year/month filter.
+
+    Supports keyset pagination: pass `limit` plus the `watched_date` and
+    `id` of the last entry from the previous page as `after` (ISO format)
+    and `after_id`. Unlike OFFSET, each page is a constant-cost index seek
+    regardless of depth. The id tiebreak matters because watched_date is
+    day-granularity and several entries routinely share a day; a bare
+    date cursor would drop the rest of the boundary day.
+    """
+    query = select(DiaryEntry)
+
+    if after:
+        try:
+            after_dt = datetime.fromisoformat(after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+        if after_id is not None:
+            query = query.where(or_(
+                DiaryEntry.watched_date < after_dt,
+                and_(DiaryEntry.watched_date == after_dt, DiaryEntry.id < after_id),
+            ))
+        else:
+            query = query.where(DiaryEntry.watched_date < after_dt)
 
     if year:
-        query = query.filter(
+        query = query.where(
             DiaryEntry.watched_date >= datetime(year, 1, 1),
             DiaryEntry.watched_date < datetime(year + 1, 1, 1)
         )
     if month and year:
         next_month = month + 1 if month < 12 else 1
         next_year = year if month < 12 else year + 1
-        query = query.filter(
+        query = query.where(
             DiaryEntry.watched_date >= datetime(year, month, 1),
             DiaryEntry.watched_date < datetime(next_year, next_month, 1)
         )
 
-    entries = query.order_by(DiaryEntry.watched_date.desc()).all()
-    films = {f.id: f for f in db.query(Film).all()}
+    # selectinload keeps the diary rows narrow: one query for entries, then
+    # a single WHERE id IN (...) fetch of just the film columns we render.
+    query = query.options(
+        selectinload(DiaryEntry.film).load_only(Film.title, Film.year, Film.poster_url)
+    ).order_by(DiaryEntry.watched_date.desc(), DiaryEntry.id.desc())
+    if limit:
+        query = query.limit(limit)
+
+    entries = (await db.scalars(query)).all()
 
     result = []
     for e in entries:
-        film = films.get(e.film_id)
+        film = e.film
         if film:
             result.append({
                 "id": e.id,
@@ -1294,17 +1421,24 @@ def get_diary(
 
 
 @app.get("/api/watchlist")
-def get_watchlist(db: Session = Depends(get_db)):
+async def get_watchlist(db: AsyncSession = Depends(get_db)):
     """Get user's watchlist with streaming availability."""
-    watchlist_items = db.query(WatchlistItem).all()
+    watchlist_items = (await db.scalars(
+        select(WatchlistItem).options(
+            selectinload(WatchlistItem.film).load_only(
+                Film.title, Film.year, Film.poster_url, Film.rating,
+                Film.runtime_minutes, Film.genres_json, Film.directors_json,
+                Film.genres_names_json, Film.directors_names_json,
+            )
+        )
+    )).all()
     watchlist_film_ids = [w.film_id for w in watchlist_items]
 
-    films = {f.id: f for f in db.query(Film).filter(Film.id.in_(watchlist_film_ids)).all()}
-    tmdb_data = {t.film_id: t for t in db.query(TmdbFilm).filter(TmdbFilm.film_id.in_(watchlist_film_ids)).all()}
+    tmdb_data = {t.film_id: t for t in (await db.scalars(select(TmdbFilm).where(TmdbFilm.film_id.in_(watchlist_film_ids)))).all()}
 
     result = []
     for item in watchlist_items:
-        film = films.get(item.film_id)
+        film = item.film
         if film:
             tmdb = tmdb_data.get(item.film_id)
 
@@ -1331,9 +1465,9 @@ def get_watchlist(db: Session = Depends(get_db)):
 
 
 @app.get("/api/profile")
-def get_profile(db: Session = Depends(get_db)):
+async def get_profile(db: AsyncSession = Depends(get_db)):
     """Get user profile."""
-    user = db.query(User).first()
+    user = await db.scalar(select(User).limit(1))
     if not user:
         username = os.environ.get("LETTERBOXD_USERNAME")
         if not username:
@@ -1360,20 +1494,21 @@ def get_profile(db: Session = Depends(get_db)):
 
 
 @app.get("/api/calendar")
-def get_calendar(year: Optional[int] = None, db: Session = Depends(get_db)):
+async def get_calendar(year: Optional[int] = None, db: AsyncSession = Depends(get_db)):
     """Get calendar heatmap data for the last 365 days."""
     now = datetime.utcnow()
     start_date = now - timedelta(days=365)
 
-    entries = db.query(DiaryEntry).filter(
-        DiaryEntry.watched_date >= start_date
-    ).all()
-
-    day_counter = Counter()
-    for e in entries:
-        if e.watched_date:
-            day_key = e.watched_date.strftime("%Y-%m-%d")
-            day_counter[day_key] += 1
+    # Format and group in SQLite so Python never materializes the entries.
+    rows = (await db.execute(
+        select(
+            func.strftime("%Y-%m-%d", DiaryEntry.watched_date).label("day"),
+            func.count().label("count"),
+        )
+        .where(DiaryEntry.watched_date >= start_date)
+        .group_by("day")
+    )).all()
+    day_counter = {day: count for day, count in rows}
 
     result = []
     current = start_date
@@ -1398,4 +1533,4 @@ async def serve_spa(full_path: str):
     if index_path.exists():
         return FileResponse(index_path)
 
-    return HTMLResponse(content="<h1>Frontend not built</h1>", status_code=200)
+    return _FRONTEND_NOT_BUILT
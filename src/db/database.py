@@ -1,16 +1,79 @@
 import os
-from sqlalchemy import create_engine
+
+import orjson
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_PATH = os.environ.get("DATABASE_PATH", "/Users/yang/apps/your_letterboxd/data/letterboxd.db")
+# Resolved once at import so relative DATABASE_PATH values don't depend on
+# the working directory of whichever process opens the connection.
+DATABASE_PATH = os.path.abspath(
+    os.environ.get("DATABASE_PATH", "/Users/yang/apps/your_letterboxd/data/letterboxd.db")
+)
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+def _json_serializer(value):
+    return orjson.dumps(value).decode()
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Sync engine: used by the scraper/sync jobs and init_db.
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=10,
+    max_overflow=20,
+    # orjson is much faster than stdlib json for the wide *_json columns.
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: used by the API so request handlers don't block the event loop.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
-def get_db():
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Tune SQLite for a read-heavy API with a background sync writer.
+
+    WAL lets readers proceed while the sync job writes, synchronous=NORMAL
+    drops redundant fsyncs (safe under WAL), and the cache/mmap settings
+    keep hot pages in memory instead of re-reading from disk.
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # 1 GiB comfortably covers the whole database file, so reads come out
+    # of mapped memory instead of pread() syscalls.
+    cursor.execute("PRAGMA mmap_size=1073741824")
+    cursor.close()
+
+
+# Guarded on dialect so pointing DATABASE_URL at another backend doesn't
+# send SQLite PRAGMAs down a foreign connection.
+if engine.dialect.name == "sqlite":
+    event.listens_for(engine, "connect")(_set_sqlite_pragmas)
+if async_engine.dialect.name == "sqlite":
+    event.listens_for(async_engine.sync_engine, "connect")(_set_sqlite_pragmas)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -18,6 +81,78 @@ def get_db():
         db.close()
 
 
+# Columns added to tables that shipped in earlier releases. create_all
+# only creates missing tables, and deployed databases persist across
+# upgrades (docker-compose mounts /app/data), so these are retrofitted
+# with ALTER TABLE on startup. Types come from the model metadata so the
+# DDL can't drift from the Column definitions.
+_RETROFIT_COLUMNS = (
+    ("films", "genres_names_json"),
+    ("films", "directors_names_json"),
+    ("tmdb_films", "data_hash"),
+)
+
+# Unique indexes back the sync upserts' ON CONFLICT targets. Before one
+# is created on an upgraded database, collapse any duplicate rows it
+# would reject, keeping the most recently written (highest id) row.
+_DEDUP_BEFORE_UNIQUE = {
+    "ix_user_films_user_film": (
+        "DELETE FROM user_films WHERE id NOT IN "
+        "(SELECT MAX(id) FROM user_films GROUP BY user_id, film_id)"
+    ),
+    "ix_watchlist_user_film": (
+        "DELETE FROM watchlist_items WHERE id NOT IN "
+        "(SELECT MAX(id) FROM watchlist_items GROUP BY user_id, film_id)"
+    ),
+}
+
+
+def _apply_schema_deltas(connection, metadata):
+    """Bring a pre-existing database up to the current model schema.
+
+    Every step is idempotent: columns are only added when the live table
+    lacks them, so running on a fresh or already-migrated database is a
+    no-op.
+    """
+    inspector = inspect(connection)
+    for table_name, column_name in _RETROFIT_COLUMNS:
+        if column_name in {c["name"] for c in inspector.get_columns(table_name)}:
+            continue
+        column = metadata.tables[table_name].columns[column_name]
+        column_type = column.type.compile(connection.dialect)
+        connection.exec_driver_sql(
+            f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"
+        )
+
+    # create_all also skips indexes on pre-existing tables; without the
+    # unique ones the sync upserts fail outright ("ON CONFLICT clause
+    # does not match any PRIMARY KEY or UNIQUE constraint"), so build
+    # whatever the live schema is missing.
+    for table in metadata.tables.values():
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            dedup = _DEDUP_BEFORE_UNIQUE.get(index.name)
+            if index.unique and dedup:
+                connection.exec_driver_sql(dedup)
+            index.create(bind=connection, checkfirst=True)
+
+
+# create_all checks every table's existence against the live schema, so
+# repeated init_db() calls within one process (each sync entrypoint
+# calls it defensively) would pay that round of introspection each time.
+_initialized = False
+
+
 def init_db():
+    global _initialized
+    if _initialized:
+        return
     from src.db.models import Base
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        _apply_schema_deltas(connection, Base.metadata)
+    _initialized = True
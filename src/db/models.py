@@ -1,7 +1,13 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Index, JSON, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from src.db.database import Base
+from src.db.types import ZstdJSON
+
+# Large, queryable JSON payloads: stored as plain JSON text on SQLite but
+# as binary JSONB when the engine points at Postgres, where containment
+# filters and GIN indexing become available.
+VariantJSON = JSON().with_variant(JSONB(), "postgresql")
 
 
 class User(Base):
@@ -17,12 +23,12 @@ class User(Base):
     favorites_json = Column(JSON)
     stats_json = Column(JSON)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    diary_entries = relationship("DiaryEntry", back_populates="user", cascade="all, delete-orphan")
-    watchlist_items = relationship("WatchlistItem", back_populates="user", cascade="all, delete-orphan")
-    user_films = relationship("UserFilm", back_populates="user", cascade="all, delete-orphan")
+    diary_entries = relationship("DiaryEntry", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    watchlist_items = relationship("WatchlistItem", back_populates="user", cascade="all, delete-orphan", lazy="raise")
+    user_films = relationship("UserFilm", back_populates="user", cascade="all, delete-orphan", lazy="raise")
 
 
 class Film(Base):
@@ -50,6 +56,10 @@ class Film(Base):
 
     genres_json = Column(JSON)
     directors_json = Column(JSON)
+    # Name lists precomputed at sync time so list endpoints don't rebuild
+    # them from the full genre/director payloads on every request.
+    genres_names_json = Column(JSON)
+    directors_names_json = Column(JSON)
     crew_json = Column(JSON)
     cast_json = Column(JSON)
     countries_json = Column(JSON)
@@ -61,13 +71,43 @@ class Film(Base):
     tmdb_id = Column(String(50))
     imdb_id = Column(String(50))
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    diary_entries = relationship("DiaryEntry", back_populates="film", lazy="raise")
+    watchlist_items = relationship("WatchlistItem", back_populates="film", lazy="raise")
+    user_films = relationship("UserFilm", back_populates="film", lazy="raise")
+    tmdb_data = relationship("TmdbFilm", back_populates="film", uselist=False, cascade="all, delete-orphan", lazy="raise")
+
+    # Streams "top-rated films of a decade" queries in index order so the
+    # planner can stop at LIMIT instead of sorting the whole year range.
+    __table_args__ = (Index("ix_films_year_rating", year, rating.desc()),)
+
+
+class FilmGenre(Base):
+    """Normalized film→genre rows.
+
+    genres_json stays as the cached full payload; these rows exist so genre
+    filters resolve via an index probe instead of scanning JSON text.
+    """
+    __tablename__ = "film_genres"
+
+    id = Column(Integer, primary_key=True)
+    film_id = Column(Integer, ForeignKey("films.id"), nullable=False, index=True)
+    genre = Column(String(100), nullable=False)
+
+    __table_args__ = (Index("ix_film_genres_genre_film", genre, film_id, unique=True),)
 
-    diary_entries = relationship("DiaryEntry", back_populates="film")
-    watchlist_items = relationship("WatchlistItem", back_populates="film")
-    user_films = relationship("UserFilm", back_populates="film")
-    tmdb_data = relationship("TmdbFilm", back_populates="film", uselist=False, cascade="all, delete-orphan")
+
+class FilmDirector(Base):
+    """Normalized film→director rows, mirroring FilmGenre."""
+    __tablename__ = "film_directors"
+
+    id = Column(Integer, primary_key=True)
+    film_id = Column(Integer, ForeignKey("films.id"), nullable=False, index=True)
+    director = Column(String(200), nullable=False)
+
+    __table_args__ = (Index("ix_film_directors_director_film", director, film_id, unique=True),)
 
 
 class DiaryEntry(Base):
@@ -86,13 +126,22 @@ class DiaryEntry(Base):
     review_text = Column(Text)
     review_has_spoilers = Column(Boolean, default=False)
 
-    letterboxd_id = Column(String(100), unique=True)
+    # Unique: it's the ON CONFLICT target for the bulk diary upsert, which
+    # needs the index probe rather than a table scan per conflicting row.
+    letterboxd_id = Column(String(100), unique=True, index=True)
+
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user = relationship("User", back_populates="diary_entries", lazy="raise")
+    film = relationship("Film", back_populates="diary_entries", lazy="raise")
 
-    user = relationship("User", back_populates="diary_entries")
-    film = relationship("Film", back_populates="diary_entries")
+    # Covers the ORDER BY watched_date DESC listings and their film join,
+    # plus per-user date-range filters (diary by year/month).
+    __table_args__ = (
+        Index("ix_diary_watched_film", watched_date.desc(), film_id),
+        Index("ix_diary_user_watched", user_id, watched_date),
+    )
 
 
 class UserFilm(Base):
@@ -115,11 +164,15 @@ class UserFilm(Base):
     first_watched = Column(DateTime)
     last_watched = Column(DateTime)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    user = relationship("User", back_populates="user_films")
-    film = relationship("Film", back_populates="user_films")
+    user = relationship("User", back_populates="user_films", lazy="raise")
+    film = relationship("Film", back_populates="user_films", lazy="raise")
+
+    # A user has at most one row per film; the unique composite also lets
+    # sync upserts resolve conflicts with a single B-tree probe.
+    __table_args__ = (Index("ix_user_films_user_film", user_id, film_id, unique=True),)
 
 
 class WatchlistItem(Base):
@@ -132,11 +185,13 @@ class WatchlistItem(Base):
 
     added_date = Column(DateTime)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User", back_populates="watchlist_items", lazy="raise")
+    film = relationship("Film", back_populates="watchlist_items", lazy="raise")
 
-    user = relationship("User", back_populates="watchlist_items")
-    film = relationship("Film", back_populates="watchlist_items")
+    __table_args__ = (Index("ix_watchlist_user_film", user_id, film_id, unique=True),)
 
 
 class SyncLog(Base):
@@ -146,7 +201,7 @@ class SyncLog(Base):
     id = Column(Integer, primary_key=True)
     sync_type = Column(String(50), nullable=False)
     username = Column(String(100), nullable=False)
-    started_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=False, server_default=func.now())
     completed_at = Column(DateTime)
     status = Column(String(20), default="running")
     items_processed = Column(Integer, default=0)
@@ -185,12 +240,12 @@ class TmdbFilm(Base):
     collection_name = Column(String(300))
     collection_poster_path = Column(String(300))
 
-    keywords_json = Column(JSON)
+    keywords_json = Column(VariantJSON)
 
-    watch_providers_json = Column(JSON)
+    watch_providers_json = Column(ZstdJSON)
 
-    similar_json = Column(JSON)
-    recommendations_json = Column(JSON)
+    similar_json = Column(VariantJSON)
+    recommendations_json = Column(VariantJSON)
 
     imdb_id = Column(String(20))
     wikidata_id = Column(String(50))
@@ -200,14 +255,18 @@ class TmdbFilm(Base):
 
     videos_json = Column(JSON)
 
-    cast_json = Column(JSON)
-    crew_json = Column(JSON)
+    cast_json = Column(ZstdJSON)
+    crew_json = Column(ZstdJSON)
 
     production_companies_json = Column(JSON)
 
+    # MD5 of the parsed TMDB payload; force re-syncs compare it in the
+    # upsert's WHERE so unchanged films skip the 30-column rewrite.
+    data_hash = Column(String(32))
+
     last_synced_at = Column(DateTime)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    film = relationship("Film", back_populates="tmdb_data")
+    film = relationship("Film", back_populates="tmdb_data", lazy="raise")
@@ -3,9 +3,10 @@ Main entrypoint that runs both the API server and the scheduler.
 """
 
 import logging
+import os
+
 import uvicorn
 
-from src.api.main import app
 from src.scheduler import create_scheduler
 
 logging.basicConfig(
@@ -18,11 +19,20 @@ logger = logging.getLogger(__name__)
 
 
 def main():
-    scheduler = create_scheduler()
-    scheduler.start()
-    logger.info("Scheduler started")
-
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_config=None)
+    # The scheduler lives in this parent process only; uvicorn workers fork
+    # from here without re-running it, so syncs never run twice. Setting
+    # SCHEDULER_ENABLED=false turns it off, so a deployment can run the API
+    # and a dedicated sync worker (python -m src.scheduler) as separate
+    # containers sharing the database volume.
+    if os.environ.get("SCHEDULER_ENABLED", "true").lower() not in ("false", "0", "no"):
+        scheduler = create_scheduler()
+        scheduler.start()
+        logger.info("Scheduler started")
+    else:
+        logger.info("Scheduler disabled via SCHEDULER_ENABLED")
+
+    workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    uvicorn.run("src.api.main:app", host="0.0.0.0", port=8000, workers=workers, log_config=None)
 
 
 if __name__ == "__main__":
@@ -57,19 +57,13 @@ def create_scheduler() -> BackgroundScheduler:
     scheduler = BackgroundScheduler()
 
     if LETTERBOXD_USERNAME:
-        parts = SYNC_SCHEDULE.split()
-        if len(parts) == 5:
-            trigger = CronTrigger(
-                minute=parts[0],
-                hour=parts[1],
-                day=parts[2],
-                month=parts[3],
-                day_of_week=parts[4],
-            )
+        try:
+            trigger = CronTrigger.from_crontab(SYNC_SCHEDULE)
+        except ValueError as e:
+            logger.error(f"Invalid SYNC_SCHEDULE: {SYNC_SCHEDULE}: {e}")
+        else:
             scheduler.add_job(sync_job, trigger, id="letterboxd_sync")
             logger.info(f"Scheduled sync for {LETTERBOXD_USERNAME} at: {SYNC_SCHEDULE}")
-        else:
-            logger.error(f"Invalid SYNC_SCHEDULE: {SYNC_SCHEDULE}")
     else:
         logger.warning("LETTERBOXD_USERNAME not set, scheduler disabled")
 
@@ -77,9 +71,19 @@ def create_scheduler() -> BackgroundScheduler:
 
 
 if __name__ == "__main__":
+    import sys
+    import time
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
 
-    sync_job()
+    if "--serve" in sys.argv:
+        # Run as a dedicated sync worker (pair with SCHEDULER_ENABLED=false
+        # on the API container so only this process schedules syncs).
+        create_scheduler().start()
+        while True:
+            time.sleep(3600)
+    else:
+        sync_job()
@@ -7,10 +7,12 @@ Default: 1 request per 2 seconds (30 requests/minute).
 
 import time
 import logging
+import threading
 from functools import wraps
-from typing import Optional, Any
+from typing import Any, Iterator, Optional
 from datetime import datetime
 
+from cachetools import LRUCache
 from letterboxdpy.user import User
 from letterboxdpy.movie import Movie
 
@@ -18,21 +20,30 @@ logger = logging.getLogger(__name__)
 
 
 class RateLimiter:
-    """Simple rate limiter with configurable delay between requests."""
+    """Rate limiter with a configurable delay between requests.
+
+    Safe to share between threads: each caller atomically claims the next
+    request slot under a lock, then sleeps outside it, so concurrent
+    fetchers line up at min_delay intervals instead of racing. Uses the
+    monotonic clock so wall-clock adjustments can't distort the delay.
+    """
+
+    __slots__ = ("min_delay", "_lock", "_next_slot")
 
     def __init__(self, min_delay: float = 4.0):
         self.min_delay = min_delay
-        self.last_request_time: Optional[float] = None
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
 
     def wait(self):
         """Wait if necessary to respect rate limit."""
-        if self.last_request_time is not None:
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.min_delay:
-                sleep_time = self.min_delay - elapsed
-                logger.debug(f"Rate limiting: sleeping {sleep_time:.2f}s")
-                time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        with self._lock:
+            now = time.monotonic()
+            sleep_time = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_delay
+        if sleep_time > 0:
+            logger.debug(f"Rate limiting: sleeping {sleep_time:.2f}s")
+            time.sleep(sleep_time)
 
 
 _rate_limiter = RateLimiter(min_delay=4.0)
@@ -58,11 +69,33 @@ class LetterboxdClient:
             min_delay: Minimum seconds between requests (default: 4.0)
         """
         self.rate_limiter = RateLimiter(min_delay=min_delay)
+        self._user_cache: dict[str, User] = {}
+        # Bounded so a huge library can't grow the memo without limit; a
+        # client lives for one sync run, so entries never go stale.
+        # LRUCache reorders its recency list even on reads and is not
+        # thread-safe, so the concurrent detail fetchers access it only
+        # under the lock.
+        self._film_cache: LRUCache = LRUCache(maxsize=4096)
+        self._film_cache_lock = threading.Lock()
 
     def _wait(self):
         """Apply rate limiting before request."""
         self.rate_limiter.wait()
 
+    def _get_user_obj(self, username: str) -> User:
+        """Fetch and parse a user's profile page, memoized per client.
+
+        Constructing letterboxdpy's User downloads and parses the profile
+        page; get_user/get_user_films/get_user_diary/get_user_watchlist all
+        need one, so caching it saves three redundant fetch+parse cycles
+        per sync run.
+        """
+        user = self._user_cache.get(username)
+        if user is None:
+            user = User(username)
+            self._user_cache[username] = user
+        return user
+
     def get_user(self, username: str) -> dict:
         """
         Get user profile data.
@@ -76,7 +109,7 @@ class LetterboxdClient:
         logger.info(f"Fetching user profile: {username}")
 
         try:
-            user = User(username)
+            user = self._get_user_obj(username)
         except Exception as e:
             logger.error(f"FAILED to fetch user '{username}': {e}")
             raise
@@ -90,41 +123,43 @@ class LetterboxdClient:
             "stats": getattr(user, "stats", {}),
         }
 
-    def get_user_films(self, username: str) -> list[dict]:
+    def get_user_films(self, username: str) -> Iterator[dict]:
         """
         Get all films a user has logged (watched).
 
-        Returns list of dicts with film info including user's rating.
+        Yields dicts with film info including user's rating, so consumers
+        can pipeline rows into batched DB writes instead of holding the
+        whole list in memory.
         """
         self._wait()
         logger.info(f"Fetching watched films for: {username}")
 
         try:
-            user = User(username)
+            user = self._get_user_obj(username)
             films_data = user.get_films()
         except Exception as e:
             logger.error(f"FAILED to fetch watched films for '{username}': {e}")
             raise
 
-        result = []
-        if isinstance(films_data, dict):
-            movies = films_data.get("movies", {})
-            if isinstance(movies, dict):
-                for slug, data in movies.items():
-                    if not isinstance(data, dict):
-                        continue
-                    raw_rating = data.get("rating")
-                    rating = raw_rating / 2.0 if raw_rating else None
-                    result.append({
-                        "slug": slug,
-                        "name": data.get("name"),
-                        "year": data.get("year"),
-                        "rating": rating,
-                        "liked": data.get("liked", False),
-                    })
-        return result
-
-    def get_user_diary(self, username: str, year: Optional[int] = None) -> list[dict]:
+        if not isinstance(films_data, dict):
+            return
+        movies = films_data.get("movies", {})
+        if not isinstance(movies, dict):
+            return
+        for slug, data in movies.items():
+            if not isinstance(data, dict):
+                continue
+            raw_rating = data.get("rating")
+            rating = raw_rating / 2.0 if raw_rating else None
+            yield {
+                "slug": slug,
+                "name": data.get("name"),
+                "year": data.get("year"),
+                "rating": rating,
+                "liked": data.get("liked", False),
+            }
+
+    def get_user_diary(self, username: str, year: Optional[int] = None) -> Iterator[dict]:
         """
         Get user's diary entries.
 
@@ -132,13 +167,13 @@ class LetterboxdClient:
             username: Letterboxd username
             year: Optional year to filter by
 
-        Returns list of diary entry dicts.
+        Yields diary entry dicts.
         """
         self._wait()
         logger.info(f"Fetching diary for: {username}" + (f" (year={year})" if year else ""))
 
         try:
-            user = User(username)
+            user = self._get_user_obj(username)
             if year:
                 diary_data = user.get_diary(year=year)
             else:
@@ -147,60 +182,58 @@ class LetterboxdClient:
             logger.error(f"FAILED to fetch diary for '{username}': {e}")
             raise
 
-        entries = []
-        if isinstance(diary_data, dict):
-            entries_dict = diary_data.get("entries", diary_data)
-            for entry_id, data in entries_dict.items():
-                if not isinstance(data, dict):
-                    continue
-                actions = data.get("actions", {})
-                date_info = data.get("date", {})
-
-                date_str = None
-                if isinstance(date_info, dict) and date_info.get("year"):
-                    date_str = f"{date_info['year']}-{date_info.get('month', 1):02d}-{date_info.get('day', 1):02d}"
-
-                raw_rating = actions.get("rating")
-                rating = raw_rating / 2.0 if raw_rating else None
-
-                entries.append({
-                    "id": entry_id,
-                    "film_slug": data.get("slug"),
-                    "film_name": data.get("name"),
-                    "date": date_str,
-                    "rating": rating,
-                    "rewatch": actions.get("rewatched", False),
-                    "liked": actions.get("liked", False),
-                })
-        return entries
-
-    def get_user_watchlist(self, username: str) -> list[dict]:
+        if not isinstance(diary_data, dict):
+            return
+        entries_dict = diary_data.get("entries", diary_data)
+        for entry_id, data in entries_dict.items():
+            if not isinstance(data, dict):
+                continue
+            actions = data.get("actions", {})
+            date_info = data.get("date", {})
+
+            date_str = None
+            if isinstance(date_info, dict) and date_info.get("year"):
+                date_str = f"{date_info['year']}-{date_info.get('month', 1):02d}-{date_info.get('day', 1):02d}"
+
+            raw_rating = actions.get("rating")
+            rating = raw_rating / 2.0 if raw_rating else None
+
+            yield {
+                "id": entry_id,
+                "film_slug": data.get("slug"),
+                "film_name": data.get("name"),
+                "date": date_str,
+                "rating": rating,
+                "rewatch": actions.get("rewatched", False),
+                "liked": actions.get("liked", False),
+            }
+
+    def get_user_watchlist(self, username: str) -> Iterator[dict]:
         """
         Get user's watchlist.
 
-        Returns list of film dicts on the watchlist.
+        Yields film dicts on the watchlist.
         """
         self._wait()
         logger.info(f"Fetching watchlist for: {username}")
 
         try:
-            user = User(username)
+            user = self._get_user_obj(username)
             watchlist_data = user.get_watchlist_movies()
         except Exception as e:
             logger.error(f"FAILED to fetch watchlist for '{username}': {e}")
             raise
 
-        result = []
-        if isinstance(watchlist_data, dict):
-            for film_id, data in watchlist_data.items():
-                if not isinstance(data, dict):
-                    continue
-                result.append({
-                    "slug": data.get("slug"),
-                    "name": data.get("name"),
-                    "year": data.get("year"),
-                })
-        return result
+        if not isinstance(watchlist_data, dict):
+            return
+        for film_id, data in watchlist_data.items():
+            if not isinstance(data, dict):
+                continue
+            yield {
+                "slug": data.get("slug"),
+                "name": data.get("name"),
+                "year": data.get("year"),
+            }
 
     def get_film(self, slug: str) -> dict:
         """
@@ -210,7 +243,16 @@ class LetterboxdClient:
             slug: Film slug (e.g., "the-godfather")
 
         Returns dict with full film details including all available metadata.
+
+        Memoized per client: the same slug is reachable through the watched
+        list, diary and watchlist in one sync run, and a repeat hit would
+        otherwise pay the rate-limit delay plus a full page parse again.
         """
+        with self._film_cache_lock:
+            cached = self._film_cache.get(slug)
+        if cached is not None:
+            return cached
+
         self._wait()
         logger.info(f"Fetching film details: {slug}")
 
@@ -220,23 +262,28 @@ class LetterboxdClient:
             logger.error(f"FAILED to fetch film '{slug}': {e}")
             raise
 
-        crew = getattr(movie, "crew", {}) or {}
+        # Snapshot the parsed attributes once; letterboxdpy fills them in
+        # during __init__, so a dict lookup replaces repeated attribute
+        # protocol round trips per field.
+        d = vars(movie)
+
+        crew = d.get("crew") or {}
         directors = crew.get("director", [])
 
-        details = getattr(movie, "details", []) or []
-        countries = [d for d in details if d.get("type") == "country"]
-        languages = [d for d in details if d.get("type") == "language"]
-        studios = [d for d in details if d.get("type") == "studio"]
+        details = d.get("details") or []
+        countries = [item for item in details if item.get("type") == "country"]
+        languages = [item for item in details if item.get("type") == "language"]
+        studios = [item for item in details if item.get("type") == "studio"]
 
         import re
-        tmdb_link = getattr(movie, "tmdb_link", None)
+        tmdb_link = d.get("tmdb_link")
         tmdb_id = None
         if tmdb_link:
             match = re.search(r'/movie/(\d+)', tmdb_link)
             if match:
                 tmdb_id = match.group(1)
 
-        imdb_link = getattr(movie, "imdb_link", None)
+        imdb_link = d.get("imdb_link")
         imdb_id = None
         if imdb_link:
             match = re.search(r'/title/(tt\d+)', imdb_link)
@@ -249,37 +296,40 @@ class LetterboxdClient:
         except Exception as e:
             logger.warning(f"Failed to get watchers stats for {slug}: {e}")
 
-        return {
+        result = {
             "slug": slug,
-            "letterboxd_id": getattr(movie, "id", None),
-            "title": getattr(movie, "title", None),
-            "original_title": getattr(movie, "original_title", None),
-            "year": getattr(movie, "year", None),
-            "alternative_titles": getattr(movie, "alternative_titles", []),
-
-            "poster": getattr(movie, "poster", None),
-            "banner": getattr(movie, "banner", None),
-            "trailer": getattr(movie, "trailer", None),
-
-            "runtime": getattr(movie, "runtime", None),
-            "tagline": getattr(movie, "tagline", None),
-            "description": getattr(movie, "description", None),
-            "genres": getattr(movie, "genres", []),
-
-            "rating": getattr(movie, "rating", None),
+            "letterboxd_id": d.get("id"),
+            "title": d.get("title"),
+            "original_title": d.get("original_title"),
+            "year": d.get("year"),
+            "alternative_titles": d.get("alternative_titles", []),
+
+            "poster": d.get("poster"),
+            "banner": d.get("banner"),
+            "trailer": d.get("trailer"),
+
+            "runtime": d.get("runtime"),
+            "tagline": d.get("tagline"),
+            "description": d.get("description"),
+            "genres": d.get("genres", []),
+
+            "rating": d.get("rating"),
             "watchers_stats": watchers_stats,
 
             "directors": directors,
             "crew": crew,
-            "cast": getattr(movie, "cast", []),
+            "cast": d.get("cast", []),
 
             "countries": countries,
             "languages": languages,
             "studios": studios,
 
-            "popular_reviews": getattr(movie, "popular_reviews", []),
+            "popular_reviews": d.get("popular_reviews", []),
 
-            "url": getattr(movie, "url", None),
+            "url": d.get("url"),
             "tmdb_id": tmdb_id,
             "imdb_id": imdb_id,
         }
+        with self._film_cache_lock:
+            self._film_cache[slug] = result
+        return result
@@ -6,46 +6,110 @@ We use a conservative 0.3s delay between requests.
 """
 
 import os
+import sqlite3
+import threading
 import time
 import logging
 from typing import Optional, Any
-from datetime import datetime
+from datetime import timedelta
 
-import requests
+import hishel
+import httpx
+import orjson
+from cachetools import TTLCache
+
+from src.db.database import DATABASE_PATH
 
 logger = logging.getLogger(__name__)
 
 TMDB_API_BASE = "https://api.themoviedb.org/3"
 TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p"
 
+# On-disk HTTP cache next to the database, so restarts don't re-download
+# movie payloads that TMDB served within the last week.
+HTTP_CACHE_PATH = os.path.join(os.path.dirname(DATABASE_PATH), "tmdb_http_cache.db")
+
+_PROVIDER_TIERS = ("flatrate", "rent", "buy")
+
+# Shared fallbacks for chained .get() lookups; treated as immutable so a
+# miss doesn't allocate a fresh empty container per parse.
+_EMPTY_DICT: dict = {}
+
+# Everything the enrichment sync stores; callers that only need base
+# fields can pass a smaller set and skip both the transfer and the parse.
+DEFAULT_INCLUDE = frozenset({
+    "credits", "keywords", "release_dates", "external_ids",
+    "watch/providers", "similar", "recommendations", "videos",
+})
+
+
+def _parse_country_providers(providers: dict) -> dict:
+    """Map one country's watch-provider block onto our schema."""
+    parsed = {"link": providers.get("link")}
+    for tier in _PROVIDER_TIERS:
+        parsed[tier] = [
+            {"id": p.get("provider_id"), "name": p.get("provider_name"), "logo": p.get("logo_path")}
+            for p in providers.get(tier) or ()
+        ]
+    return parsed
+
 
 class TmdbRateLimiter:
-    """Rate limiter for TMDB API (40 requests per 10 seconds)."""
+    """Token-bucket rate limiter for the TMDB API (40 requests per 10s).
+
+    Unlike a fixed inter-request delay, a bucket lets callers burst up to
+    capacity before anyone sleeps, while the refill rate still caps the
+    sustained request rate. Token accounting happens under a lock on the
+    monotonic clock, so concurrent fetchers share one budget and NTP
+    adjustments can't distort the spacing; the sleep itself happens
+    outside the lock.
+    """
 
-    def __init__(self, min_delay: float = 0.3):
-        self.min_delay = min_delay
-        self.last_request_time: Optional[float] = None
+    __slots__ = ("capacity", "refill_per_sec", "tokens", "last", "lock")
+
+    def __init__(self, min_delay: float = 0.3, capacity: int = 40):
+        self.capacity = float(capacity)
+        self.refill_per_sec = 1.0 / min_delay if min_delay > 0 else float("inf")
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
 
     def wait(self):
-        """Wait if necessary to respect rate limit."""
-        if self.last_request_time is not None:
-            elapsed = time.time() - self.last_request_time
-            if elapsed < self.min_delay:
-                sleep_time = self.min_delay - elapsed
-                time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        """Take one token, sleeping until the bucket refills if empty."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.last) * self.refill_per_sec,
+            )
+            self.last = now
+            # Debit before sleeping: a negative balance means this caller
+            # (and any queued behind it) has claimed tokens that will only
+            # accrue while it sleeps, so concurrent waiters line up on
+            # distinct refill slots instead of racing for the same one.
+            self.tokens -= 1.0
+            delay = -self.tokens / self.refill_per_sec if self.tokens < 0 else 0.0
+        if delay:
+            time.sleep(delay)
 
 
 class TmdbClient:
     """TMDB API client for fetching movie enrichment data."""
 
-    def __init__(self, api_key: Optional[str] = None, min_delay: float = 0.3):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        min_delay: float = 0.3,
+        http_cache: bool = True,
+    ):
         """
         Initialize TMDB client.
 
         Args:
             api_key: TMDB access token. If not provided, reads from TMDB_ACCESS_TOKEN env var.
             min_delay: Minimum seconds between requests (default: 0.3)
+            http_cache: Serve repeat GETs from the on-disk response cache
+                        (default: True; disable to force fresh fetches)
         """
         self.api_key = api_key or os.environ.get("TMDB_ACCESS_TOKEN")
         if not self.api_key:
@@ -55,11 +119,41 @@ class TmdbClient:
         logger.info("TMDB client initialized")
 
         self.rate_limiter = TmdbRateLimiter(min_delay=min_delay)
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        })
+        client_kwargs: dict[str, Any] = dict(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+        if http_cache:
+            # HTTP/2 client with a transparent disk cache: concurrent
+            # fetches multiplex over one TLS connection instead of
+            # handshaking per request, and repeat GETs within the TTL come
+            # back from SQLite instead of the network. force_cache
+            # overrides TMDB's short Cache-Control since movie payloads
+            # barely change week to week.
+            self.session = hishel.CacheClient(
+                controller=hishel.Controller(force_cache=True),
+                storage=hishel.SQLiteStorage(
+                    connection=sqlite3.connect(HTTP_CACHE_PATH, check_same_thread=False),
+                    ttl=timedelta(days=7).total_seconds(),
+                ),
+                **client_kwargs,
+            )
+        else:
+            self.session = httpx.Client(**client_kwargs)
+        # Parsed movie payloads, keyed by (tmdb_id, country). TMDB data is
+        # effectively static over a week, so repeat lookups for popular
+        # films skip the network and the rate-limit delay entirely.
+        # Disabled together with the HTTP cache so --no-cache runs always
+        # see fresh data. TTLCache mutates its expiry list even on reads
+        # and is not thread-safe, so every access from the sync's fetch
+        # workers goes through the lock.
+        self._movie_cache = TTLCache(maxsize=50_000, ttl=7 * 86400) if http_cache else None
+        self._movie_cache_lock = threading.Lock()
 
     def _request(self, endpoint: str, params: Optional[dict] = None) -> Optional[dict]:
         """Make a rate-limited request to TMDB API."""
@@ -68,12 +162,14 @@ class TmdbClient:
         url = f"{TMDB_API_BASE}{endpoint}"
         try:
             logger.debug(f"TMDB request: {endpoint}")
-            response = self.session.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            status_code = e.response.status_code if e.response else "unknown"
-            response_text = e.response.text[:500] if e.response else "no response"
+            # orjson parses the big append_to_response payloads several
+            # times faster than the stdlib decoder behind response.json().
+            return orjson.loads(response.content)
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            response_text = e.response.text[:500]
             if status_code == 404:
                 logger.warning(f"TMDB resource not found: {endpoint}")
                 return None
@@ -86,33 +182,53 @@ class TmdbClient:
                 logger.error(f"TMDB API HTTP error {status_code}: {endpoint}")
                 logger.error(f"Response: {response_text}")
             raise
-        except requests.exceptions.Timeout as e:
+        except httpx.TimeoutException:
             logger.error(f"TMDB request timeout: {endpoint}")
             raise
-        except requests.exceptions.ConnectionError as e:
+        except httpx.ConnectError as e:
             logger.error(f"TMDB connection error: {endpoint} - {e}")
             raise
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"TMDB request failed: {endpoint} - {type(e).__name__}: {e}")
             raise
 
-    def get_movie(self, tmdb_id: int, country: str = "US") -> Optional[dict]:
+    def get_movie(
+        self,
+        tmdb_id: int,
+        country: str = "US",
+        include: frozenset = DEFAULT_INCLUDE,
+        allowed_countries: Optional[frozenset] = None,
+    ) -> Optional[dict]:
         """
-        Fetch complete movie data from TMDB with all append_to_response fields.
+        Fetch movie data from TMDB with the requested append_to_response fields.
 
         Args:
             tmdb_id: TMDB movie ID
             country: Country code for watch providers and certifications (default: US)
+            include: append_to_response sections to fetch and parse
+                     (default: everything the enrichment sync stores)
+            allowed_countries: restrict parsed watch providers and
+                     certifications to these ISO codes (default: keep all)
 
         Returns:
             Parsed movie data dict or None if not found
         """
+        include = frozenset(include)
+        if allowed_countries is not None:
+            allowed_countries = frozenset(allowed_countries)
+        cache_key = (tmdb_id, country, include, allowed_countries)
+        if self._movie_cache is not None:
+            with self._movie_cache_lock:
+                cached = self._movie_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         logger.info(f"Fetching TMDB movie: {tmdb_id}")
 
         data = self._request(
             f"/movie/{tmdb_id}",
             params={
-                "append_to_response": "credits,keywords,release_dates,external_ids,watch/providers,similar,recommendations,videos",
+                "append_to_response": ",".join(sorted(include)),
                 "language": "en-US",
             }
         )
@@ -120,93 +236,114 @@ class TmdbClient:
         if not data:
             return None
 
-        return self._parse_movie_response(data, country)
-
-    def _parse_movie_response(self, data: dict, country: str = "US") -> dict:
-        """Parse TMDB movie response into our schema."""
+        parsed = self._parse_movie_response(data, country, include, allowed_countries)
+        if self._movie_cache is not None:
+            with self._movie_cache_lock:
+                self._movie_cache[cache_key] = parsed
+        return parsed
+
+    def _parse_movie_response(
+        self,
+        data: dict,
+        country: str = "US",
+        include: frozenset = DEFAULT_INCLUDE,
+        allowed_countries: Optional[frozenset] = None,
+    ) -> dict:
+        """Parse TMDB movie response into our schema.
+
+        Sections absent from `include` were never fetched, so their
+        comprehensions are skipped entirely rather than run over empty
+        defaults. TMDB lists providers and certifications for 50+
+        countries; `allowed_countries` lets single-region callers skip
+        materializing all but the ones they serve.
+        """
 
         certification = None
         certifications_all = {}
-        release_dates = data.get("release_dates", {}).get("results", [])
-        for rd in release_dates:
-            iso = rd.get("iso_3166_1")
-            releases = rd.get("release_dates", [])
-            for release in releases:
-                cert = release.get("certification")
-                if cert:
-                    certifications_all[iso] = cert
-                    if iso == country:
-                        certification = cert
-                    break
-
-        watch_providers = data.get("watch/providers", {}).get("results", {})
-        watch_providers_parsed = {}
-        for iso, providers in watch_providers.items():
-            watch_providers_parsed[iso] = {
-                "link": providers.get("link"),
-                "flatrate": [
-                    {"id": p.get("provider_id"), "name": p.get("provider_name"), "logo": p.get("logo_path")}
-                    for p in providers.get("flatrate", [])
-                ],
-                "rent": [
-                    {"id": p.get("provider_id"), "name": p.get("provider_name"), "logo": p.get("logo_path")}
-                    for p in providers.get("rent", [])
-                ],
-                "buy": [
-                    {"id": p.get("provider_id"), "name": p.get("provider_name"), "logo": p.get("logo_path")}
-                    for p in providers.get("buy", [])
-                ],
-            }
+        if "release_dates" in include:
+            release_dates = (data.get("release_dates") or _EMPTY_DICT).get("results") or ()
+            for rd in release_dates:
+                iso = rd.get("iso_3166_1")
+                if allowed_countries is not None and iso not in allowed_countries:
+                    continue
+                releases = rd.get("release_dates") or ()
+                for release in releases:
+                    cert = release.get("certification")
+                    if cert:
+                        certifications_all[iso] = cert
+                        if iso == country:
+                            certification = cert
+                        break
 
-        external_ids = data.get("external_ids", {})
-
-        keywords = [
-            {"id": kw.get("id"), "name": kw.get("name")}
-            for kw in data.get("keywords", {}).get("keywords", [])
-        ]
-
-        credits = data.get("credits", {})
-        cast = [
-            {
-                "id": c.get("id"),
-                "name": c.get("name"),
-                "character": c.get("character"),
-                "order": c.get("order"),
-                "profile_path": c.get("profile_path"),
-            }
-            for c in credits.get("cast", [])
-        ]
-        crew = [
-            {
-                "id": c.get("id"),
-                "name": c.get("name"),
-                "job": c.get("job"),
-                "department": c.get("department"),
-                "profile_path": c.get("profile_path"),
-            }
-            for c in credits.get("crew", [])
-        ]
-
-        videos = [
-            {
-                "id": v.get("id"),
-                "key": v.get("key"),
-                "name": v.get("name"),
-                "site": v.get("site"),
-                "type": v.get("type"),
-                "official": v.get("official"),
+        watch_providers_parsed = {}
+        if "watch/providers" in include:
+            watch_providers = (data.get("watch/providers") or _EMPTY_DICT).get("results") or _EMPTY_DICT
+            watch_providers_parsed = {
+                iso: _parse_country_providers(providers)
+                for iso, providers in watch_providers.items()
+                if allowed_countries is None or iso in allowed_countries
             }
-            for v in data.get("videos", {}).get("results", [])
-        ]
 
-        similar = [
-            {"id": m.get("id"), "title": m.get("title"), "poster_path": m.get("poster_path")}
-            for m in data.get("similar", {}).get("results", [])
-        ]
-        recommendations = [
-            {"id": m.get("id"), "title": m.get("title"), "poster_path": m.get("poster_path")}
-            for m in data.get("recommendations", {}).get("results", [])
-        ]
+        external_ids = (data.get("external_ids") or _EMPTY_DICT) if "external_ids" in include else _EMPTY_DICT
+
+        keywords = []
+        if "keywords" in include:
+            keywords = [
+                {"id": kw.get("id"), "name": kw.get("name")}
+                for kw in (data.get("keywords") or _EMPTY_DICT).get("keywords") or ()
+            ]
+
+        cast = []
+        crew = []
+        if "credits" in include:
+            credits = data.get("credits") or _EMPTY_DICT
+            cast = [
+                {
+                    "id": c.get("id"),
+                    "name": c.get("name"),
+                    "character": c.get("character"),
+                    "order": c.get("order"),
+                    "profile_path": c.get("profile_path"),
+                }
+                for c in credits.get("cast") or ()
+            ]
+            crew = [
+                {
+                    "id": c.get("id"),
+                    "name": c.get("name"),
+                    "job": c.get("job"),
+                    "department": c.get("department"),
+                    "profile_path": c.get("profile_path"),
+                }
+                for c in credits.get("crew") or ()
+            ]
+
+        videos = []
+        if "videos" in include:
+            videos = [
+                {
+                    "id": v.get("id"),
+                    "key": v.get("key"),
+                    "name": v.get("name"),
+                    "site": v.get("site"),
+                    "type": v.get("type"),
+                    "official": v.get("official"),
+                }
+                for v in (data.get("videos") or _EMPTY_DICT).get("results") or ()
+            ]
+
+        similar = []
+        if "similar" in include:
+            similar = [
+                {"id": m.get("id"), "title": m.get("title"), "poster_path": m.get("poster_path")}
+                for m in (data.get("similar") or _EMPTY_DICT).get("results") or ()
+            ]
+        recommendations = []
+        if "recommendations" in include:
+            recommendations = [
+                {"id": m.get("id"), "title": m.get("title"), "poster_path": m.get("poster_path")}
+                for m in (data.get("recommendations") or _EMPTY_DICT).get("results") or ()
+            ]
 
         production_companies = [
             {
@@ -215,7 +352,7 @@ class TmdbClient:
                 "logo_path": c.get("logo_path"),
                 "origin_country": c.get("origin_country"),
             }
-            for c in data.get("production_companies", [])
+            for c in data.get("production_companies") or ()
         ]
 
         collection = data.get("belongs_to_collection")
@@ -2,32 +2,80 @@
 Sync TMDB enrichment data for films in the database.
 """
 
+import hashlib
 import logging
-from datetime import datetime
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import orjson
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import exists, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from src.api.cache import clear_caches
 from src.db.database import SessionLocal, init_db
 from src.db.models import Film, TmdbFilm, SyncLog
 from src.scraper.tmdb_client import TmdbClient
 
 logger = logging.getLogger(__name__)
 
+# Columns copied verbatim from the parsed TMDB payload into TmdbFilm rows;
+# the parser emits dicts keyed by these same names.
+TMDB_PAYLOAD_COLUMNS = (
+    "tmdb_id", "budget", "revenue", "vote_average", "vote_count", "popularity",
+    "certification", "certifications_json", "status", "release_date",
+    "homepage", "origin_country_json", "collection_id", "collection_name",
+    "collection_poster_path", "keywords_json", "watch_providers_json",
+    "similar_json", "recommendations_json", "imdb_id", "wikidata_id",
+    "facebook_id", "instagram_id", "twitter_id", "videos_json", "cast_json",
+    "crew_json", "production_companies_json",
+)
+
+# Rows per multi-row upsert; these are wide rows, so stay well under
+# SQLite's bound-parameter limit.
+UPSERT_BATCH_SIZE = 500
+
+# Parallel TMDB fetches: the token bucket enforces the 40/10s budget, so
+# extra workers only overlap request latency, never raise the rate.
+TMDB_FETCH_WORKERS = 8
+
+# Cap on fetches submitted but not yet consumed; bounds memory like a
+# bounded queue would while leaving enough work queued that the pool
+# never idles while the main thread flushes a batch.
+MAX_IN_FLIGHT = 2 * UPSERT_BATCH_SIZE
+
+# Shared server-side now() expression: every row in a batch carries the
+# same construct instead of allocating a fresh one per film; SQLite
+# evaluates it once per statement anyway.
+_SQL_NOW = func.now()
+
+# Progress lines are throttled by wall time rather than item count, so
+# long runs emit a steady heartbeat instead of scaling log volume (and
+# handler flushes) with the number of films.
+PROGRESS_LOG_INTERVAL = 1.0
+
 
 class TmdbSync:
     """Sync TMDB enrichment data for films."""
 
-    def __init__(self, api_key: Optional[str] = None, min_delay: float = 0.3):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        min_delay: float = 0.3,
+        http_cache: bool = True,
+    ):
         """
         Initialize TMDB sync.
 
         Args:
             api_key: TMDB access token (or set TMDB_ACCESS_TOKEN env var)
             min_delay: Seconds between API requests (default: 0.3)
+            http_cache: Serve repeat fetches from the on-disk response
+                        cache (default: True)
         """
-        self.client = TmdbClient(api_key=api_key, min_delay=min_delay)
+        self.client = TmdbClient(api_key=api_key, min_delay=min_delay, http_cache=http_cache)
 
     def sync_all(self, db: Session, limit: Optional[int] = None, force: bool = False) -> dict:
         """
@@ -44,7 +92,6 @@ class TmdbSync:
         sync_log = SyncLog(
             sync_type="tmdb",
             username="system",
-            started_at=datetime.utcnow(),
             status="running"
         )
         db.add(sync_log)
@@ -60,41 +107,57 @@ class TmdbSync:
         }
 
         try:
-            stats["total_films"] = db.query(Film).filter(Film.tmdb_id.isnot(None)).count()
-
-            if force:
-                query = db.query(Film).filter(Film.tmdb_id.isnot(None))
-            else:
-                query = db.query(Film).outerjoin(TmdbFilm).filter(
-                    and_(
-                        Film.tmdb_id.isnot(None),
-                        TmdbFilm.id.is_(None)
-                    )
-                )
+            # Plain SELECT COUNT(*) rather than ORM .count(), which wraps
+            # the whole query in an extra subquery.
+            stats["total_films"] = db.scalar(
+                select(func.count()).select_from(Film).where(Film.tmdb_id.isnot(None))
+            )
+
+            # Core select of just the three columns the fetch needs; rows
+            # come back as lightweight tuples with no identity-map or
+            # full-column hydration cost.
+            query = select(Film.id, Film.slug, Film.tmdb_id).where(Film.tmdb_id.isnot(None))
+            if not force:
+                # NOT EXISTS anti-join instead of LEFT JOIN + IS NULL: the
+                # planner probes the unique film_id index per Film row
+                # rather than materializing the join.
+                query = query.where(~exists().where(TmdbFilm.film_id == Film.id))
 
             if limit:
                 query = query.limit(limit)
 
-            films = query.all()
-            stats["films_to_enrich"] = len(films)
+            stats["films_to_enrich"] = db.scalar(
+                select(func.count()).select_from(query.subquery())
+            )
 
             logger.info(f"TMDB sync: {stats['films_to_enrich']} films to enrich (total with tmdb_id: {stats['total_films']})")
 
-            for i, film in enumerate(films):
-                if (i + 1) % 10 == 0:
-                    logger.info(f"Progress: {i + 1}/{stats['films_to_enrich']} films processed")
-                    db.commit()
-
-                result = self._enrich_film(db, film, force)
-                if result == "enriched":
-                    stats["films_enriched"] += 1
-                elif result == "skipped":
-                    stats["films_skipped"] += 1
-                elif result == "failed":
-                    stats["films_failed"] += 1
+            # Producer/consumer pipeline: the pool fetches ahead while
+            # this thread consumes completed futures in submission order
+            # and flushes multi-row upserts, so network latency and DB
+            # writes overlap instead of alternating per batch. The query
+            # streams with yield_per and the in-flight window is bounded,
+            # so only a couple of batches are resident at a time.
+            processed = 0
+            last_progress = time.monotonic()
+            pending = []
+            in_flight: deque = deque()
+            with ThreadPoolExecutor(max_workers=TMDB_FETCH_WORKERS) as pool:
+                for film in db.execute(query.execution_options(yield_per=UPSERT_BATCH_SIZE)):
+                    in_flight.append(pool.submit(self._build_enrichment_row, film))
+                    if len(in_flight) >= MAX_IN_FLIGHT:
+                        self._consume_result(db, in_flight.popleft(), pending, stats, overwrite=force)
+                        processed += 1
+                        last_progress = self._log_progress(processed, stats, last_progress)
+                while in_flight:
+                    self._consume_result(db, in_flight.popleft(), pending, stats, overwrite=force)
+                    processed += 1
+                    last_progress = self._log_progress(processed, stats, last_progress)
+            self._flush_pending(db, pending, overwrite=force)
+            logger.info(f"Progress: {processed}/{stats['films_to_enrich']} films processed")
 
             sync_log.status = "completed" if stats["films_failed"] == 0 else "completed_with_errors"
-            sync_log.completed_at = datetime.utcnow()
+            sync_log.completed_at = func.now()
             sync_log.items_processed = stats["films_enriched"]
 
         except Exception as e:
@@ -108,83 +171,108 @@ class TmdbSync:
         logger.info(f"TMDB sync complete: {stats['films_enriched']} enriched, {stats['films_failed']} failed")
         return stats
 
-    def _enrich_film(self, db: Session, film: Film, force: bool = False) -> str:
+    def _build_enrichment_row(self, film) -> tuple:
         """
-        Enrich a single film with TMDB data.
+        Fetch TMDB data for one film and map it to a TmdbFilm row dict.
+
+        `film` needs only id/slug/tmdb_id attributes - a Core Row from
+        sync_all or a full Film from enrich_single both qualify.
 
         Returns:
-            "enriched", "skipped", or "failed"
+            ("enriched", row), ("skipped", None) or ("failed", None)
         """
         if not film.tmdb_id:
             logger.debug(f"Skipping {film.slug}: no tmdb_id")
-            return "skipped"
-
-        existing = db.query(TmdbFilm).filter(TmdbFilm.film_id == film.id).first()
-        if existing and not force:
-            logger.debug(f"Skipping {film.slug}: already enriched")
-            return "skipped"
+            return "skipped", None
 
         try:
             tmdb_id = int(film.tmdb_id)
         except (ValueError, TypeError):
             logger.error(f"Invalid tmdb_id for film {film.slug}: {film.tmdb_id}")
-            return "failed"
+            return "failed", None
 
         try:
             data = self.client.get_movie(tmdb_id)
         except Exception as e:
             logger.error(f"Failed to fetch TMDB data for {film.slug} (tmdb_id={tmdb_id}): {type(e).__name__}: {e}")
-            return "failed"
+            return "failed", None
 
         if not data:
             logger.warning(f"No TMDB data found for {film.slug} (tmdb_id={tmdb_id})")
-            return "failed"
-
-        try:
-            if existing:
-                tmdb_film = existing
-            else:
-                tmdb_film = TmdbFilm(film_id=film.id)
-                db.add(tmdb_film)
-
-            tmdb_film.tmdb_id = data.get("tmdb_id")
-            tmdb_film.budget = data.get("budget")
-            tmdb_film.revenue = data.get("revenue")
-            tmdb_film.vote_average = data.get("vote_average")
-            tmdb_film.vote_count = data.get("vote_count")
-            tmdb_film.popularity = data.get("popularity")
-            tmdb_film.certification = data.get("certification")
-            tmdb_film.certifications_json = data.get("certifications_json")
-            tmdb_film.adult = data.get("adult", False)
-            tmdb_film.status = data.get("status")
-            tmdb_film.release_date = data.get("release_date")
-            tmdb_film.homepage = data.get("homepage")
-            tmdb_film.origin_country_json = data.get("origin_country_json")
-            tmdb_film.collection_id = data.get("collection_id")
-            tmdb_film.collection_name = data.get("collection_name")
-            tmdb_film.collection_poster_path = data.get("collection_poster_path")
-            tmdb_film.keywords_json = data.get("keywords_json")
-            tmdb_film.watch_providers_json = data.get("watch_providers_json")
-            tmdb_film.similar_json = data.get("similar_json")
-            tmdb_film.recommendations_json = data.get("recommendations_json")
-            tmdb_film.imdb_id = data.get("imdb_id")
-            tmdb_film.wikidata_id = data.get("wikidata_id")
-            tmdb_film.facebook_id = data.get("facebook_id")
-            tmdb_film.instagram_id = data.get("instagram_id")
-            tmdb_film.twitter_id = data.get("twitter_id")
-            tmdb_film.videos_json = data.get("videos_json")
-            tmdb_film.cast_json = data.get("cast_json")
-            tmdb_film.crew_json = data.get("crew_json")
-            tmdb_film.production_companies_json = data.get("production_companies_json")
-            tmdb_film.last_synced_at = datetime.utcnow()
-            tmdb_film.updated_at = datetime.utcnow()
-
-            logger.debug(f"Enriched {film.slug} (tmdb_id={tmdb_id})")
-            return "enriched"
-
-        except Exception as e:
-            logger.error(f"Failed to save TMDB data for {film.slug}: {type(e).__name__}: {e}")
-            return "failed"
+            return "failed", None
+
+        row = {column: data.get(column) for column in TMDB_PAYLOAD_COLUMNS}
+        row["film_id"] = film.id
+        row["adult"] = data.get("adult", False)
+        # Fingerprint of the parsed payload; the force-mode upsert
+        # compares it against the stored hash to skip rows TMDB hasn't
+        # actually changed.
+        row["data_hash"] = hashlib.md5(
+            orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        ).hexdigest()
+        row["last_synced_at"] = _SQL_NOW
+
+        logger.debug(f"Enriched {film.slug} (tmdb_id={tmdb_id})")
+        return "enriched", row
+
+    @staticmethod
+    def _log_progress(processed: int, stats: dict, last_progress: float) -> float:
+        """Emit a progress line at most once per PROGRESS_LOG_INTERVAL."""
+        now = time.monotonic()
+        if now - last_progress < PROGRESS_LOG_INTERVAL:
+            return last_progress
+        logger.info(f"Progress: {processed}/{stats['films_to_enrich']} films processed")
+        return now
+
+    def _consume_result(self, db: Session, future, pending: list, stats: dict, overwrite: bool = True) -> None:
+        """Tally one completed fetch, flushing a full batch of rows."""
+        result, row = future.result()
+        if result == "enriched":
+            stats["films_enriched"] += 1
+            pending.append(row)
+            if len(pending) >= UPSERT_BATCH_SIZE:
+                self._flush_pending(db, pending, overwrite=overwrite)
+        elif result == "skipped":
+            stats["films_skipped"] += 1
+        elif result == "failed":
+            stats["films_failed"] += 1
+
+    def _flush_pending(self, db: Session, pending: list, overwrite: bool = True) -> None:
+        """Upsert accumulated enrichment rows in one statement.
+
+        Non-force callers only fetch films the anti-join already proved
+        have no TmdbFilm row, so they pass overwrite=False and any
+        race-leftover duplicate becomes a DO NOTHING no-op instead of a
+        30-column rewrite.
+
+        No commit here: the whole run is one transaction (and a commit
+        would tear down the yield_per cursor the caller is draining).
+        """
+        if not pending:
+            return
+        stmt = sqlite_insert(TmdbFilm).values(pending)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["film_id"],
+                set_={
+                    **{
+                        column: getattr(stmt.excluded, column)
+                        for column in TMDB_PAYLOAD_COLUMNS
+                    },
+                    "adult": stmt.excluded.adult,
+                    "data_hash": stmt.excluded.data_hash,
+                    "last_synced_at": stmt.excluded.last_synced_at,
+                    "updated_at": _SQL_NOW,
+                },
+                # Skip the wide rewrite when the payload fingerprint is
+                # unchanged; IS DISTINCT FROM so legacy NULL-hash rows
+                # still get updated.
+                where=TmdbFilm.data_hash.is_distinct_from(stmt.excluded.data_hash),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["film_id"])
+        db.execute(stmt)
+        pending.clear()
 
     def enrich_single(self, db: Session, film_id: int, force: bool = False) -> dict:
         """
@@ -205,8 +293,21 @@ class TmdbSync:
         if not film.tmdb_id:
             return {"status": "error", "message": "Film has no tmdb_id"}
 
-        result = self._enrich_film(db, film, force)
-        db.commit()
+        if not force:
+            already = db.query(TmdbFilm.id).filter(TmdbFilm.film_id == film_id).first()
+            if already:
+                result = "skipped"
+                return {
+                    "status": result,
+                    "film_id": film_id,
+                    "film_slug": film.slug,
+                    "tmdb_id": film.tmdb_id
+                }
+
+        result, row = self._build_enrichment_row(film)
+        if row:
+            self._flush_pending(db, [row])
+            db.commit()
 
         return {
             "status": result,
@@ -222,9 +323,12 @@ class TmdbSync:
         Returns:
             Dict with counts and percentages
         """
-        total_films = db.query(Film).count()
-        films_with_tmdb_id = db.query(Film).filter(Film.tmdb_id.isnot(None)).count()
-        films_enriched = db.query(TmdbFilm).count()
+        row = db.execute(select(
+            select(func.count()).select_from(Film).scalar_subquery().label("total"),
+            select(func.count()).select_from(Film).where(Film.tmdb_id.isnot(None)).scalar_subquery().label("with_tmdb_id"),
+            select(func.count()).select_from(TmdbFilm).scalar_subquery().label("enriched"),
+        )).one()
+        total_films, films_with_tmdb_id, films_enriched = row
 
         films_pending = films_with_tmdb_id - films_enriched
         films_without_tmdb_id = total_films - films_with_tmdb_id
@@ -243,7 +347,8 @@ def run_tmdb_sync(
     limit: Optional[int] = None,
     force: bool = False,
     api_key: Optional[str] = None,
-    min_delay: float = 0.3
+    min_delay: float = 0.3,
+    http_cache: bool = True,
 ) -> dict:
     """
     Run TMDB enrichment sync.
@@ -253,6 +358,7 @@ def run_tmdb_sync(
         force: Re-fetch even if already enriched
         api_key: TMDB API key
         min_delay: Seconds between requests
+        http_cache: Serve repeat fetches from the on-disk response cache
 
     Returns:
         Sync statistics dict
@@ -261,10 +367,11 @@ def run_tmdb_sync(
     db = SessionLocal()
 
     try:
-        sync = TmdbSync(api_key=api_key, min_delay=min_delay)
+        sync = TmdbSync(api_key=api_key, min_delay=min_delay, http_cache=http_cache)
         return sync.sync_all(db, limit=limit, force=force)
     finally:
         db.close()
+        clear_caches()
 
 
 if __name__ == "__main__":
@@ -279,6 +386,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Sync TMDB enrichment data")
     parser.add_argument("--limit", type=int, help="Max films to process")
     parser.add_argument("--force", action="store_true", help="Re-fetch existing data")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP response cache")
     parser.add_argument("--status", action="store_true", help="Show enrichment status only")
     args = parser.parse_args()
 
@@ -286,7 +394,7 @@ if __name__ == "__main__":
     db = SessionLocal()
 
     try:
-        sync = TmdbSync()
+        sync = TmdbSync(http_cache=not args.no_cache)
 
         if args.status:
             status = sync.get_enrichment_status(db)
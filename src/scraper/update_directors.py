@@ -3,11 +3,14 @@ One-time script to update directors for existing films.
 """
 
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from letterboxdpy.movie import Movie
+from sqlalchemy import select, update
+
 from src.db.database import SessionLocal, init_db
-from src.db.models import Film
+from src.db.models import Film, TmdbFilm
+from src.scraper.client import RateLimiter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +18,56 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Worker threads overlap page-fetch latency; the shared limiter still
+# spaces actual requests at the polite 2s interval.
+FETCH_WORKERS = 8
+COMMIT_BATCH_SIZE = 50
+
+_rate_limiter = RateLimiter(min_delay=2.0)
+
+
+def _fetch_directors(slug: str) -> list:
+    """Fetch a film's director list, rate-limited."""
+    _rate_limiter.wait()
+    movie = Movie(slug)
+    crew = getattr(movie, "crew", {}) or {}
+    return crew.get("director", [])
+
+
+_MISSING_DIRECTORS = (Film.directors_json == None) | (Film.directors_json == [])
+
+
+def _backfill_from_tmdb(db) -> int:
+    """Fill directors_json from TMDB crew data already in the database.
+
+    Films the enrichment sync has covered carry their full crew in
+    TmdbFilm.crew_json, so a join supplies their directors without a
+    single page fetch; only films TMDB hasn't covered fall through to
+    the scraper. crew_json is zstd-compressed at rest, so the filter
+    runs in SQL but the job extraction happens here rather than via
+    json_extract.
+    """
+    rows = db.execute(
+        select(Film.id, TmdbFilm.crew_json)
+        .join(TmdbFilm, TmdbFilm.film_id == Film.id)
+        .where(_MISSING_DIRECTORS, TmdbFilm.crew_json.isnot(None))
+    )
+
+    updates = []
+    for film_id, crew in rows:
+        directors = [
+            {"name": member.get("name")}
+            for member in crew
+            if member.get("job") == "Director"
+        ]
+        if directors:
+            updates.append({"id": film_id, "directors_json": directors})
+
+    if updates:
+        db.execute(update(Film), updates)
+        db.commit()
+    return len(updates)
+
 
 def update_film_directors():
     """Update directors for all films missing director data."""
@@ -22,30 +75,47 @@ def update_film_directors():
     db = SessionLocal()
 
     try:
-        films = db.query(Film).filter(
-            (Film.directors_json == None) | (Film.directors_json == [])
+        backfilled = _backfill_from_tmdb(db)
+        logger.info(f"Backfilled {backfilled} films from TMDB crew data")
+
+        # Materialize only (id, slug, title) tuples up front instead of
+        # full ORM rows; the per-batch commit below keeps the script
+        # resumable, which rules out holding a streaming cursor open.
+        films = db.query(Film.id, Film.slug, Film.title).filter(
+            _MISSING_DIRECTORS
         ).all()
 
         logger.info(f"Found {len(films)} films without director data")
 
-        for i, film in enumerate(films):
-            try:
-                logger.info(f"[{i+1}/{len(films)}] Fetching directors for: {film.title}")
-                time.sleep(2)
-
-                movie = Movie(film.slug)
-                crew = getattr(movie, "crew", {}) or {}
-                directors = crew.get("director", [])
+        processed = 0
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            for start in range(0, len(films), COMMIT_BATCH_SIZE):
+                batch = films[start:start + COMMIT_BATCH_SIZE]
+                futures = {
+                    pool.submit(_fetch_directors, slug): (film_id, title)
+                    for film_id, slug, title in batch
+                }
+                updates = []
+                for future in as_completed(futures):
+                    film_id, title = futures[future]
+                    processed += 1
+                    try:
+                        directors = future.result()
+                    except Exception as e:
+                        logger.error(f"[{processed}/{len(films)}] {title}: Error: {e}")
+                        continue
 
-                if directors:
-                    film.directors_json = directors
-                    db.commit()
-                    logger.info(f"  -> {[d.get('name') for d in directors]}")
-                else:
-                    logger.info(f"  -> No directors found")
+                    if directors:
+                        updates.append({"id": film_id, "directors_json": directors})
+                        logger.info(f"[{processed}/{len(films)}] {title} -> {[d.get('name') for d in directors]}")
+                    else:
+                        logger.info(f"[{processed}/{len(films)}] {title} -> No directors found")
 
-            except Exception as e:
-                logger.error(f"  -> Error: {e}")
+                # One executemany UPDATE by primary key per batch instead
+                # of an individual UPDATE per film.
+                if updates:
+                    db.execute(update(Film), updates)
+                db.commit()
 
         logger.info("Done!")
 